@@ -1,9 +1,14 @@
 import cloudscraper
 import json
 import os
+import re
 import sys
 import time
 from bs4 import BeautifulSoup
+from normalize import LIST_ITEM
+from similarity import update_index
+from usage import record, record_cache
+from singleflight import file_lock, single_flight
 
 
 def resource_path(relative_path: str) -> str:
@@ -12,10 +17,19 @@ def resource_path(relative_path: str) -> str:
     return os.path.join(base_path, relative_path)
 
 
+# Overridable so a local stand-in server (cf_standin.py) can replace Codeforces
+CF_BASE_URL = os.getenv("CF_BASE_URL", "https://codeforces.com").rstrip("/")
+
 data_path = resource_path("../data")
 CACHE_FILE = os.path.join(data_path, "cf_cache.json")
 SLEEP_SECONDS = 2
+# Stored while a contest is running; replaced once problemset.problems rates it
+UNRATED = "N/A"
+_refresh_ratings = True
 MAX_RETRIES = 3
+# "1900D", "1900D1": contest id, then the index (a letter plus an optional
+# digit for D1/D2-style split problems)
+KEY_RE = re.compile(r"(\d+)([A-Z]\d*)")
 RETRY_BACKOFF = 5
 
 REQUIRED_FIELDS = {
@@ -50,8 +64,17 @@ def save_cache(cache: dict) -> None:
     os.replace(tmp, CACHE_FILE)
 
 
+def store_problem(problem_key: str, problem_data: dict) -> None:
+    # Re-read under the lock: other processes may have added problems meanwhile
+    with file_lock("cf_cache"):
+        cache = load_cache()
+        cache[problem_key] = problem_data
+        save_cache(cache)
+    update_index(problem_key, problem_data)
+
+
 def get_problem_rating(problem_key: str) -> int | None:
-    api_url = "https://codeforces.com/api/problemset.problems"
+    api_url = f"{CF_BASE_URL}/api/problemset.problems"
     r = scraper.get(api_url, timeout=30)
     data = r.json()
 
@@ -74,17 +97,79 @@ def is_valid_entry(entry: dict) -> bool:
     return True
 
 
-def lookup_or_scrape(problem_key: str) -> dict | None:
+def set_rating_refresh(enabled: bool) -> None:
+    """watch turns this off: ratings don't exist while a contest runs."""
+    global _refresh_ratings
+    _refresh_ratings = enabled
+
+
+def known_rating(problem_key: str) -> int | None:
+    """
+    Rating from the local problemset store. Only reads what `pick` last
+    downloaded: a lookup never pays for a problemset.problems download.
+    """
+    from problemset import stored_problemset  # problemset imports this module
+
+    problemset = stored_problemset()
+    row = problemset.row(problem_key) if problemset is not None else None
+    if row is None:
+        return None
+    return int(problemset.columns["rating"][row]) or None
+
+
+def refresh_rating(problem_key: str, entry: dict) -> dict:
+    """Swap an UNRATED placeholder for the real rating once there is one."""
+    rating = known_rating(problem_key) if _refresh_ratings else None
+    if rating is None:
+        return entry
+    entry = {**entry, "rating": rating}
+    store_problem(problem_key, entry)
+    return entry
+
+
+def lookup_or_scrape(problem_key: str, rating: int | str | None = None) -> dict | None:
+    """
+    Return the cached problem or scrape it. `rating` may be passed when the
+    caller already knows it (or UNRATED for a contest that is still running),
+    which skips the problemset.problems download. Entries cached as UNRATED
+    get their rating filled in by later lookups that do not pass one.
+    """
     cache = load_cache()
 
     if problem_key in cache and is_valid_entry(cache[problem_key]):
-        return cache[problem_key]
+        record_cache("problem", True, problem_key)
+        entry = cache[problem_key]
+        if rating is None and not isinstance(entry["rating"], int):
+            entry = refresh_rating(problem_key, entry)
+        return entry
+    record_cache("problem", False, problem_key)
 
-    contest_id = "".join(filter(str.isdigit, problem_key))
-    index = "".join(filter(str.isalpha, problem_key)).upper()
-    url = f"https://codeforces.com/contest/{contest_id}/problem/{index}"
+    with single_flight("scrape", problem_key):
+        # Another process may have scraped it while we waited for the lock
+        cache = load_cache()
+        if problem_key in cache and is_valid_entry(cache[problem_key]):
+            return cache[problem_key]
+        problem_data = scrape_problem(problem_key, rating)
 
-    rating = get_problem_rating(problem_key)
+    if problem_data is not None:
+        time.sleep(SLEEP_SECONDS)
+    return problem_data
+
+
+def split_key(problem_key: str) -> tuple[int, str] | None:
+    match = KEY_RE.fullmatch(problem_key.strip().upper())
+    return (int(match[1]), match[2]) if match else None
+
+
+def scrape_problem(problem_key: str, rating: int | str | None = None) -> dict | None:
+    parsed = split_key(problem_key)
+    if parsed is None:
+        return None
+    contest_id, index = parsed
+    url = f"{CF_BASE_URL}/contest/{contest_id}/problem/{index}"
+
+    if rating is None:
+        rating = get_problem_rating(problem_key)
     if rating is None:
         return None  # rating is mandatory
 
@@ -104,6 +189,11 @@ def lookup_or_scrape(problem_key: str) -> dict | None:
             if not statement_div or not title_div:
                 raise Exception("HTML structure changed")
 
+            # get_text("\n") splits inline tags and list items alike;
+            # mark where each item starts so they are not merged later
+            for item in statement_div.find_all("li"):
+                item.insert(0, LIST_ITEM)
+
             input_spec = statement_div.find("div", class_="input-specification")
             output_spec = statement_div.find("div", class_="output-specification")
 
@@ -125,13 +215,11 @@ def lookup_or_scrape(problem_key: str) -> dict | None:
             if not is_valid_entry(problem_data):
                 return None
 
-            cache[problem_key] = problem_data
-            save_cache(cache)
-
-            time.sleep(SLEEP_SECONDS)
+            store_problem(problem_key, problem_data)
             return problem_data
 
         except Exception:
             if attempt == MAX_RETRIES:
                 return None
+            record(problem_key, retries=1)
             time.sleep(RETRY_BACKOFF)
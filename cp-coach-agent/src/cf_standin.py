@@ -0,0 +1,205 @@
+"""
+Local stand-in for the parts of Codeforces that cpcoach talks to, so contest
+releases can be rehearsed without touching codeforces.com:
+
+    python cf_standin.py --contest 9999 --problems 5 --release-after 30
+    CF_BASE_URL=http://127.0.0.1:8765 cpcoach watch 9999
+"""
+
+import argparse
+import json
+import string
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PROBLEM_HTML = """<html><body>
+<div class="problem-statement">
+<div class="header">
+<div class="title">{index}. {name}</div>
+<div class="time-limit"><div class="property-title">time limit per test</div>1 second</div>
+<div class="memory-limit"><div class="property-title">memory limit per test</div>256 megabytes</div>
+<div class="input-file"><div class="property-title">input</div>standard input</div>
+<div class="output-file"><div class="property-title">output</div>standard output</div>
+</div>
+<div><p>You are given an array of $$$n$$$ integers $$$a_1, a_2, \\ldots, a_n$$$.
+Find the {what} of the array modulo $$${modulo}$$$.</p></div>
+<div class="input-specification"><div class="section-title">Input</div>
+<p>The first line contains $$$n$$$ ($$$1 \\le n \\le 2 \\cdot 10^5$$$).
+The second line contains $$$n$$$ integers ($$$1 \\le a_i \\le 10^9$$$).</p></div>
+<div class="output-specification"><div class="section-title">Output</div>
+<p>Print a single integer.</p></div>
+<div class="sample-tests"><div class="section-title">Example</div>
+<div class="sample-test"><div class="input"><div class="title">Input</div>
+<pre>3
+1 2 3</pre></div><div class="output"><div class="title">Output</div><pre>{answer}</pre></div></div></div>
+</div></body></html>"""
+
+WHATS = ["sum", "maximum", "minimum", "xor", "product", "number of inversions"]
+ANSWERS = ["6", "3", "1", "0", "6", "0"]
+
+
+def make_problems(contest_id: int, count: int) -> list[dict]:
+    return [
+        {
+            "contestId": contest_id,
+            "index": index,
+            "name": f"Stand-in Problem {index}",
+            "type": "PROGRAMMING",
+            "rating": 800 + 300 * i,
+            "tags": ["implementation"] if i % 2 == 0 else ["math"],
+        }
+        for i, index in enumerate(string.ascii_uppercase[:count])
+    ]
+
+
+class StandinServer(ThreadingHTTPServer):
+    """Serves one contest whose problems become visible at `release_at`."""
+
+    daemon_threads = True
+
+    def __init__(self, address, contest_id: int, problems: list[dict], release_at):
+        super().__init__(address, StandinHandler)
+        self.contest_id = contest_id
+        self.problems = problems
+        self.release_at = release_at
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def released(self) -> bool:
+        return time.time() >= self.release_at
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status: int, body: str, content_type: str) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, payload: dict) -> None:
+        self.send_body(200, json.dumps(payload), "application/json")
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+
+        if url.path == "/api/contest.standings":
+            contest_id = int(query.get("contestId", ["0"])[0])
+            if contest_id != server.contest_id or not server.released():
+                self.send_json(
+                    {
+                        "status": "FAILED",
+                        "comment": f"contestId: Contest with id {contest_id} "
+                        "has not started",
+                    }
+                )
+                return
+            # Ratings are only assigned after a contest ends
+            problems = [
+                {k: v for k, v in p.items() if k != "rating"} for p in server.problems
+            ]
+            self.send_json(
+                {
+                    "status": "OK",
+                    "result": {
+                        "contest": {"id": contest_id, "phase": "CODING"},
+                        "problems": problems,
+                        "rows": [],
+                    },
+                }
+            )
+
+        elif url.path == "/api/problemset.problems":
+            problems = server.problems if server.released() else []
+            self.send_json(
+                {
+                    "status": "OK",
+                    "result": {
+                        "problems": problems,
+                        "problemStatistics": [
+                            {
+                                "contestId": p["contestId"],
+                                "index": p["index"],
+                                "solvedCount": 0,
+                            }
+                            for p in problems
+                        ],
+                    },
+                }
+            )
+
+        elif (
+            len(parts) == 4
+            and parts[0] == "contest"
+            and parts[2] == "problem"
+            and parts[1] == str(server.contest_id)
+            and server.released()
+        ):
+            for i, p in enumerate(server.problems):
+                if p["index"] == parts[3].upper():
+                    html = PROBLEM_HTML.format(
+                        index=p["index"],
+                        name=p["name"],
+                        what=WHATS[i % len(WHATS)],
+                        modulo=10**9 + 7,
+                        answer=ANSWERS[i % len(ANSWERS)],
+                    )
+                    self.send_body(200, html, "text/html; charset=utf-8")
+                    return
+            self.send_body(404, "Not found", "text/plain")
+
+        else:
+            self.send_body(404, "Not found", "text/plain")
+
+
+def start_standin(
+    contest_id: int,
+    problem_count: int = 5,
+    release_after: float = 0,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> StandinServer:
+    """Start a stand-in server on a background thread; port 0 picks a free one."""
+    server = StandinServer(
+        (host, port),
+        contest_id,
+        make_problems(contest_id, problem_count),
+        time.time() + release_after,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Codeforces stand-in")
+    parser.add_argument("--contest", type=int, default=9999)
+    parser.add_argument("--problems", type=int, default=5)
+    parser.add_argument(
+        "--release-after", type=float, default=30, help="Seconds until release"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = start_standin(
+        args.contest, args.problems, args.release_after, args.host, args.port
+    )
+    print(f"Stand-in Codeforces on {server.url}, contest {args.contest}")
+    print(f"Problems are released in {args.release_after:.0f}s. Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
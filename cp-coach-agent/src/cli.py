@@ -8,8 +8,16 @@ from utils import (
     getProblemAnalysis,
     resource_path,
     getHint,
-    write_solution,
+    generate_solutions,
+    LANGUAGES,
+    find_similar,
+    analysis_cache_path,
 )
+from cf_lookup import lookup_or_scrape, load_cache
+from problemset import load_problemset, SORT_KEYS
+from watch import watch_contest, POLL_SECONDS
+import usage
+from singleflight import held_locks
 
 from pdf import generate_pdf_report
 from dotenv import load_dotenv
@@ -51,6 +59,11 @@ solution_parser.add_argument(
     required=True,
     help="Path to file containing the problem statement",
 )
+solution_parser.add_argument(
+    "--lang",
+    default="cpp",
+    help=f"Comma separated languages ({', '.join(LANGUAGES)}), e.g. cpp,py,java",
+)
 
 # --- PDF Report Command ---
 pdf_parser = subparsers.add_parser("report", help="Generate PDF report for a problem")
@@ -60,6 +73,71 @@ pdf_parser.add_argument("-d", "--dark", action="store_true", help="Dark theme")
 pdf_parser.add_argument("-p", "--print", action="store_true", help="Print theme")
 pdf_parser.add_argument("-o", "--open", action="store_true", help="Auto-open PDF")
 
+# --- Similar Command ---
+similar_parser = subparsers.add_parser(
+    "similar", help="List previously scraped problems similar to a problem"
+)
+similar_parser.add_argument("problem_number", help="Problem number (e.g. 116A, 267G)")
+similar_parser.add_argument(
+    "-k", type=int, default=5, help="Number of similar problems to list"
+)
+
+# --- Pick Command ---
+pick_parser = subparsers.add_parser(
+    "pick", help="Pick practice problems from the Codeforces problemset"
+)
+pick_parser.add_argument("--min-rating", type=int)
+pick_parser.add_argument("--max-rating", type=int)
+pick_parser.add_argument(
+    "--tags", help="Comma separated tags, all required (e.g. dp,greedy)"
+)
+pick_parser.add_argument("--any-tags", help="Comma separated tags, at least one")
+pick_parser.add_argument("--contest-from", type=int)
+pick_parser.add_argument("--contest-to", type=int)
+pick_parser.add_argument("--min-solved", type=int)
+pick_parser.add_argument("--max-solved", type=int)
+pick_parser.add_argument("--sort", choices=SORT_KEYS, default="rating")
+pick_parser.add_argument("--desc", action="store_true", help="Sort descending")
+pick_parser.add_argument("--limit", "-n", type=int, default=20)
+pick_parser.add_argument(
+    "--refresh", action="store_true", help="Re-download the problemset first"
+)
+pick_parser.add_argument(
+    "--ids", action="store_true", help="Print only problem numbers (for piping)"
+)
+pick_parser.add_argument(
+    "--analyze", action="store_true", help="Analyze every picked problem"
+)
+
+# --- Watch Command ---
+watch_parser = subparsers.add_parser(
+    "watch", help="Prefetch and pre-analyze a contest as soon as it is released"
+)
+watch_parser.add_argument("contest_id", type=int, help="Contest id (e.g. 1900)")
+watch_parser.add_argument(
+    "--interval", type=float, default=POLL_SECONDS, help="Seconds between polls"
+)
+watch_parser.add_argument("--workers", type=int, default=2)
+watch_parser.add_argument(
+    "--lang",
+    default="cpp",
+    help="Solutions to pre-generate after all hints, comma separated ('' for none)",
+)
+watch_parser.add_argument(
+    "--timeout", type=float, help="Give up if nothing is released within N seconds"
+)
+
+# --- Usage Command ---
+usage_parser = subparsers.add_parser(
+    "usage", help="Show or export Gemini token, call and cache-hit accounting"
+)
+usage_parser.add_argument(
+    "--format", choices=("text", "json", "prom"), default="text", dest="fmt"
+)
+usage_parser.add_argument(
+    "--out", help="Write the export to a file (e.g. a Prometheus textfile)"
+)
+
 # --- Setup Command ---
 setup_parser = subparsers.add_parser("setup", help="Set your API key")
 setup_parser.add_argument("api_key", help="Your API key for CPCoach")
@@ -70,6 +148,57 @@ doctor_parser = subparsers.add_parser(
 )
 
 args = parser.parse_args()
+usage.set_command(args.command or "none")
+
+
+def parse_languages(text):
+    # dict.fromkeys: drop repeats ("cpp,cpp") but keep the order given
+    return list(
+        dict.fromkeys(lang.strip().lower() for lang in text.split(",") if lang.strip())
+    )
+
+
+def print_prompt_savings(stats):
+    if stats is None:
+        return  # Nothing was sent; the analysis came from another process
+    saved = stats["raw_tokens"] - stats["prompt_tokens"]
+    percent = 100 * saved / stats["raw_tokens"] if stats["raw_tokens"] else 0
+    print(
+        Fore.CYAN
+        + f"[PROMPT] ~{stats['raw_tokens']} -> ~{stats['prompt_tokens']} tokens"
+        f" (saved ~{saved}, {percent:.0f}%)"
+    )
+
+
+def print_usage_summary():
+    usage.flush()  # include this process's own batched counters
+    data = usage.load_usage()
+    totals = data["totals"]
+    quota = usage.daily_quota()
+    used = usage.tokens_today(data)
+    print(
+        Fore.CYAN
+        + f"[USAGE] Tokens today: {used}"
+        + (f" / {quota} quota" if quota is not None else " (no daily quota)")
+    )
+    print(
+        Fore.CYAN + f"[USAGE] Gemini calls: {totals.get('gemini_calls', 0)}, "
+        f"input tokens: {totals.get('input_tokens', 0)}, "
+        f"output tokens: {totals.get('output_tokens', 0)}, "
+        f"retries: {totals.get('retries', 0)}"
+    )
+    for kind in ("problem", "analysis", "code"):
+        hits = totals.get(f"{kind}_cache_hits", 0)
+        misses = totals.get(f"{kind}_cache_misses", 0)
+        rate = f"{100 * hits / (hits + misses):.0f}%" if hits + misses else "N/A"
+        print(
+            Fore.CYAN + f"[USAGE] {kind.title()} cache: {hits} hits, "
+            f"{misses} misses ({rate})"
+        )
+    for command, row in sorted(data["by_command"].items()):
+        calls = row.get("gemini_calls", 0)
+        tokens = row.get("input_tokens", 0) + row.get("output_tokens", 0)
+        print(Fore.CYAN + f"  {command:<10} {calls:>5} calls {tokens:>10} tokens")
 
 
 def print_banner():
@@ -96,6 +225,10 @@ if args.command is None:
     print("  hint      - Get hints for problems")
     print("  solution  - Generate solution from file")
     print("  report    - Generate PDF report for a problem")
+    print("  similar   - List similar problems from the local cache")
+    print("  pick      - Pick practice problems by rating, tags, contest, solves")
+    print("  watch     - Pre-analyze a contest the moment its problems are released")
+    print("  usage     - Show or export token, cost and cache-hit accounting")
     print("  setup     - Set your API key")
     print("  doctor    - Check system status (API key, cache, environment)")
     print("\nUse 'cpcoach <command> --help' for more information on a command.")
@@ -114,6 +247,7 @@ elif args.command == "analyze":
     )
     os.makedirs(cache_file.parent, exist_ok=True)
 
+    usage.record_cache("analysis", cache_file.exists(), args.problem_number)
     if cache_file.exists():
         time.sleep(2)
         print(
@@ -121,11 +255,15 @@ elif args.command == "analyze":
             + f"[COMPLETE] Analysis of Problem {args.problem_number.upper()} is Complete.\nYou may ask for a hint or the solution now"
         )
     else:
-        getProblemAnalysis(args.problem_number)
-        print(
-            Fore.GREEN
-            + f"[COMPLETE] Analysis of Problem {args.problem_number.upper()} is Complete.\nYou may ask for a hint or the solution now"
-        )
+        try:
+            print_prompt_savings(getProblemAnalysis(args.problem_number))
+            print(
+                Fore.GREEN
+                + f"[COMPLETE] Analysis of Problem {args.problem_number.upper()} is Complete.\nYou may ask for a hint or the solution now"
+            )
+        except usage.QuotaExceeded as e:
+            print(Fore.RED + f"[ERROR] {e}")
+            exit(1)
 
 elif args.command == "hint":
     if not args.problem_number:
@@ -146,16 +284,40 @@ elif args.command == "hint":
             print(Fore.RED + "[HINT] Select a hint level using -l1 ... -l5")
 
 elif args.command == "solution":
+    languages = parse_languages(args.lang)
+    unknown = [lang for lang in languages if lang not in LANGUAGES]
+
     if not args.problem_number:
         print(Fore.RED + "[ERROR] Must Enter A Problem Number.")
     elif not os.path.isfile(args.file):
         print(Fore.RED + f"[ERROR] File not found: {args.file}")
         exit(1)
+    elif not languages or unknown:
+        print(
+            Fore.RED
+            + f"[ERROR] Unknown language(s): {', '.join(unknown) or args.lang}. "
+            f"Choose from {', '.join(LANGUAGES)}"
+        )
+        exit(1)
     else:
-        print(Fore.BLUE + f"[WRITING] Writing Solution To {args.file}....")
-        write_solution(args.file, args.problem_number)
-        time.sleep(0.75)
-        print(Fore.GREEN + f"[SUCCESS] Solution Written To {args.file} !")
+        print(Fore.BLUE + f"[WRITING] Preparing {', '.join(languages)} solution(s)....")
+        try:
+            solutions = generate_solutions(args.problem_number, languages)
+        except usage.QuotaExceeded as e:
+            print(Fore.RED + f"[ERROR] {e}")
+            exit(1)
+
+        for lang, code in solutions.items():
+            # A single language goes to --file, several get one file per extension
+            if len(languages) == 1:
+                target = Path(args.file)
+            else:
+                target = Path(args.file).with_suffix(LANGUAGES[lang][1])
+            target.write_text(code, encoding="utf-8")
+            print(
+                Fore.GREEN
+                + f"[SUCCESS] {LANGUAGES[lang][0]} Solution Written To {target} !"
+            )
 
 elif args.command == "report":
     if not args.problem_number:
@@ -180,6 +342,124 @@ elif args.command == "report":
             args.problem_number.strip().upper(), theme=theme, auto_open=auto_open
         )
 
+elif args.command == "similar":
+    problem_key = args.problem_number.strip().upper()
+    if lookup_or_scrape(problem_key) is None:
+        print(Fore.RED + f"[ERROR] Could not load problem {problem_key}")
+        exit(1)
+
+    results = find_similar(problem_key, k=args.k)
+    if not results:
+        print(Fore.YELLOW + "[SIMILAR] No other problems in the local cache yet")
+    else:
+        problems = load_cache()
+        print(Fore.BLUE + f"[SIMILAR] Problems closest to {problem_key}:")
+        for key, score in results:
+            entry = problems.get(key, {})
+            analysed = "analysed" if os.path.exists(analysis_cache_path(key)) else ""
+            print(
+                Fore.GREEN + f"  {key:<8} {score:.3f}  {entry.get('title', 'N/A')} "
+                f"(rating {entry.get('rating', 'N/A')}) {analysed}"
+            )
+
+elif args.command == "pick":
+
+    def split_tags(value):
+        return [t.strip() for t in value.split(",") if t.strip()] if value else None
+
+    problemset = load_problemset(refresh=args.refresh)
+    start = time.perf_counter()
+    try:
+        rows = problemset.select(
+            min_rating=args.min_rating,
+            max_rating=args.max_rating,
+            tags=split_tags(args.tags),
+            any_tags=split_tags(args.any_tags),
+            contest_from=args.contest_from,
+            contest_to=args.contest_to,
+            min_solved=args.min_solved,
+            max_solved=args.max_solved,
+            sort=args.sort,
+            descending=args.desc,
+            limit=args.limit,
+        )
+    except ValueError as e:
+        print(Fore.RED + f"[ERROR] {e}")
+        exit(1)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    picked = [problemset.key(row) for row in rows]
+
+    if args.ids:
+        print("\n".join(picked))
+    else:
+        print(
+            Fore.BLUE + f"[PICK] {len(picked)} of {len(problemset)} problems"
+            f" in {elapsed_ms:.1f} ms"
+        )
+        for row, key in zip(rows, picked):
+            rating = problemset.columns["rating"][row] or "N/A"
+            solved = problemset.columns["solved"][row]
+            tags = ", ".join(problemset.row_tags(row))
+            print(
+                Fore.GREEN + f"  {key:<8} {rating:>5}  {solved:>7} solved"
+                f"  {problemset.names[row]}  [{tags}]"
+            )
+
+    if args.analyze:
+        for key in picked:
+            if os.path.exists(analysis_cache_path(key)):
+                print(Fore.GREEN + f"[ANALYZE] {key} already analyzed")
+                continue
+            print(Fore.BLUE + f"[ANALYZE] Processing {key}....")
+            try:
+                print_prompt_savings(getProblemAnalysis(key))
+                print(Fore.GREEN + f"[COMPLETE] Analysis of Problem {key} is Complete.")
+            except usage.QuotaExceeded as e:
+                print(Fore.RED + f"[ERROR] {e}. Stopping batch.")
+                break
+            except Exception as e:
+                print(Fore.RED + f"[ERROR] Analysis of {key} failed: {e}")
+
+elif args.command == "watch":
+    languages = parse_languages(args.lang)
+    unknown = [lang for lang in languages if lang not in LANGUAGES]
+    if unknown:
+        print(Fore.RED + f"[ERROR] Unknown language(s): {', '.join(unknown)}")
+        exit(1)
+
+    colors = {"ERROR": Fore.RED, "TIMEOUT": Fore.RED, "WAIT": Fore.YELLOW}
+
+    def log(tag, message):
+        print(colors.get(tag, Fore.GREEN) + f"[{tag}] {message}")
+
+    print(Fore.BLUE + f"[WATCH] Watching contest {args.contest_id}....")
+    status = watch_contest(
+        args.contest_id,
+        languages=languages,
+        workers=args.workers,
+        poll_seconds=args.interval,
+        timeout=args.timeout,
+        log=log,
+    )
+    for key, state in status.items():
+        print(Fore.CYAN + f"  {key:<8} {state}")
+
+elif args.command == "usage":
+    if args.fmt == "text":
+        print_usage_summary()
+    else:
+        exported = (
+            usage.export_json() if args.fmt == "json" else usage.export_prometheus()
+        )
+        if args.out:
+            # Write then rename so a textfile collector never reads half a file
+            tmp = args.out + ".tmp"
+            Path(tmp).write_text(exported, encoding="utf-8")
+            os.replace(tmp, args.out)
+            print(Fore.GREEN + f"[USAGE] Written to {args.out}")
+        else:
+            print(exported)
+
 elif args.command == "setup":
     api_key = args.api_key.strip()
     env_path = Path(os.getcwd()) / ".env"
@@ -216,6 +496,16 @@ elif args.command == "doctor":
     else:
         print(Fore.RED + f"[ERROR] Cache folder does not exist: {cache_path}")
 
+    # In-flight work (locks die with their process, so these are all live)
+    for lock in held_locks():
+        print(
+            Fore.CYAN + f"[INFO] In flight: {lock['name']} (pid {lock.get('pid', '?')} "
+            f"on {lock.get('host', '?')})"
+        )
+
+    # Usage and quota
+    print_usage_summary()
+
     # Report working directory
     print(Fore.CYAN + f"[INFO] Current working directory: {os.getcwd()}")
     print(Fore.CYAN + "[DOCTOR] Diagnostics complete")
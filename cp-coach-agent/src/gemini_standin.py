@@ -0,0 +1,140 @@
+"""
+Local stand-in for the Gemini generateContent endpoint. Analysis prompts get
+a canned analysis JSON, code prompts a canned program, after a configurable
+latency:
+
+    python gemini_standin.py --latency 0.5
+    GEMINI_BASE_URL=http://127.0.0.1:8766 cpcoach analyze 9999A
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANALYSIS = {
+    "hints": {f"level{i}": f"Stand-in hint number {i}." for i in range(1, 6)},
+    "summary": {
+        "problem_statement": "Stand-in problem statement.",
+        "input_format": {"description": "n, then n integers.", "structure": []},
+        "output_format": {"description": "A single integer.", "structure": []},
+        "constraints": {
+            "time_limit": "1 second",
+            "memory_limit": "256 megabytes",
+            "bounds": ["1 <= n <= 2 * 10^5"],
+        },
+        "sample_cases": [{"input": "3\n1 2 3", "output": "6"}],
+        "key_requirements": [],
+    },
+    "analysis": {
+        "key_observation": "A single pass over the array is enough.",
+        "edge_cases": ["n = 1"],
+        "naive_failures": [],
+        "problem_category": {"primary": "implementation", "secondary": []},
+        "complexity_analysis": {},
+    },
+    "solution": {
+        "language": "C++17",
+        "approach": "Scan the array once.",
+        "time_complexity": "O(n)",
+        "space_complexity": "O(1)",
+        "key_insights": ["Accumulate while reading."],
+        "code": "",
+        "explanation": {"algorithm_steps": [], "edge_cases_handled": []},
+        "test_verification": {},
+    },
+}
+CODE = """#include <bits/stdc++.h>
+using namespace std;
+int main() {
+    long long n, x, s = 0;
+    cin >> n;
+    while (n--) { cin >> x; s += x; }
+    cout << s << endl;
+}"""
+
+
+class GeminiStandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, jitter: float = 0.0):
+        super().__init__(address, GeminiStandinHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class GeminiStandinHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+
+        with server.lock:
+            server.calls += 1
+        time.sleep(max(0.0, server.latency + random.uniform(0, server.jitter)))
+
+        text = json.dumps(ANALYSIS) if "REQUIRED JSON STRUCTURE" in prompt else CODE
+        body = json.dumps(
+            {
+                "candidates": [
+                    {
+                        "content": {"role": "model", "parts": [{"text": text}]},
+                        "finishReason": "STOP",
+                    }
+                ],
+                "usageMetadata": {
+                    "promptTokenCount": len(prompt) // 4,
+                    "candidatesTokenCount": len(text) // 4,
+                    "totalTokenCount": (len(prompt) + len(text)) // 4,
+                },
+            }
+        ).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_gemini_standin(
+    latency: float = 0.0, jitter: float = 0.0, host: str = "127.0.0.1", port: int = 0
+) -> GeminiStandinServer:
+    """Start a stand-in server on a background thread; port 0 picks a free one."""
+    server = GeminiStandinServer((host, port), latency, jitter)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Gemini stand-in")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    server = start_gemini_standin(args.latency, args.jitter, args.host, args.port)
+    print(f"Stand-in Gemini on {server.url}. Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,317 @@
+"""
+Load generator for cpcoach. N concurrent clients replay a mix of hint /
+analyze / report commands, each as its own cpcoach process, against the
+Codeforces and Gemini stand-ins in a throwaway copy of the app. Afterwards
+the caches are checked for lost writes and corrupted files.
+
+    python loadtest.py --clients 8 --requests 10 --mix hint=5,analyze=3,report=2
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from cf_standin import start_standin
+from gemini_standin import start_gemini_standin
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SRC_DIR, "..", "data")
+CONTEST_ID = 9999
+OPERATIONS = ("hint", "analyze", "report")
+
+
+def parse_mix(text: str) -> dict[str, int]:
+    mix = {}
+    for item in text.split(","):
+        op, _, weight = item.partition("=")
+        op = op.strip()
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown operation in mix: {op}")
+        mix[op] = int(weight or 1)
+    return mix
+
+
+def make_sandbox(root: str) -> tuple[str, str]:
+    """Copy the app into `root` so a run never touches the real caches."""
+    src = os.path.join(root, "app", "src")
+    data = os.path.join(root, "app", "data")
+    shutil.copytree(SRC_DIR, src, ignore=shutil.ignore_patterns("__pycache__"))
+    os.makedirs(data)
+    shutil.copy(os.path.join(DATA_DIR, "themes.json"), data)
+    shutil.copytree(os.path.join(DATA_DIR, "fonts"), os.path.join(data, "fonts"))
+    return os.path.join(src, "cli.py"), data
+
+
+def command_args(op: str, problem: str, rng: random.Random) -> list[str]:
+    if op == "hint":
+        return ["hint", problem, f"--level{rng.randint(1, 5)}"]
+    if op == "analyze":
+        return ["analyze", problem]
+    return ["report", problem, "--print"]
+
+
+def run_client(cli, env, workdir, ops, problems, rng, results, lock) -> None:
+    os.makedirs(workdir, exist_ok=True)
+    for op in ops:
+        problem = rng.choice(problems)
+        # As it appears in the traceback: resource_path() leaves "src/../data"
+        cache_file = os.path.join("data", "cache", f"{problem.lower()}.txt")
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, cli, *command_args(op, problem, rng)],
+            cwd=workdir,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        elapsed = time.perf_counter() - start
+
+        error = None
+        if proc.returncode != 0:
+            lines = proc.stderr.strip().splitlines()
+            error = lines[-1] if lines else f"exit code {proc.returncode}"
+        elif "[ERROR]" in proc.stdout:
+            error = next(l for l in proc.stdout.splitlines() if "[ERROR]" in l)
+
+        # hint / report need an analysis first; failing on exactly that
+        # missing cache file is expected, anything else counts as an error
+        not_analyzed = (
+            error is not None
+            and op != "analyze"
+            and error.startswith("FileNotFoundError")
+            and cache_file in error
+        )
+        with lock:
+            results.append(
+                {
+                    "op": op,
+                    "problem": problem,
+                    "seconds": elapsed,
+                    "error": None if not_analyzed else error,
+                    "not_analyzed": not_analyzed,
+                }
+            )
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def summarize(results: list[dict], wall_seconds: float) -> dict:
+    summary = {}
+    for op in OPERATIONS:
+        rows = [r for r in results if r["op"] == op]
+        if not rows:
+            continue
+        served = [r for r in rows if not r["not_analyzed"]]
+        latencies = [r["seconds"] * 1000 for r in served]
+        errors = [r["error"] for r in served if r["error"]]
+        summary[op] = {
+            "requests": len(rows),
+            "not_analyzed": len(rows) - len(served),
+            "errors": len(errors),
+            "error_rate": len(errors) / len(served) if served else 0.0,
+            "throughput_per_s": len(rows) / wall_seconds,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "error_kinds": {e: errors.count(e) for e in set(errors)},
+        }
+    return summary
+
+
+def is_valid_pdf(path: str) -> bool:
+    with open(path, "rb") as f:
+        data = f.read()
+    return data.startswith(b"%PDF") and b"%%EOF" in data[-1024:]
+
+
+def check_integrity(data_dir: str, workdirs: list[str], results: list[dict]) -> dict:
+    """Look for lost cache writes, unreadable caches, broken PDFs, temp files."""
+    ok = [r for r in results if r["error"] is None and not r["not_analyzed"]]
+    scraped = {r["problem"] for r in ok if r["op"] in ("analyze", "report")}
+    analyzed = {r["problem"] for r in ok}
+
+    report = {
+        "cf_cache_corrupt": False,
+        "lost_cache_writes": [],
+        "corrupt_files": [],
+        "stray_temp_files": [],
+    }
+
+    try:
+        with open(os.path.join(data_dir, "cf_cache.json"), encoding="utf-8") as f:
+            cf_cache = json.load(f)
+    except (OSError, ValueError):
+        cf_cache = {}
+        report["cf_cache_corrupt"] = bool(scraped)
+    report["lost_cache_writes"] += [
+        f"cf_cache.json:{p}" for p in sorted(scraped) if p not in cf_cache
+    ]
+
+    for problem in sorted(analyzed):
+        path = os.path.join(data_dir, "cache", f"{problem.lower()}.txt")
+        if not os.path.exists(path):
+            report["lost_cache_writes"].append(f"cache/{problem.lower()}.txt")
+            continue
+        try:
+            with open(path, encoding="utf-8") as f:
+                json.load(f)["analysis"]["hints"]
+        except (OSError, ValueError, KeyError, TypeError):
+            report["corrupt_files"].append(path)
+
+    index_path = os.path.join(data_dir, "similarity_index.npz")
+    if os.path.exists(index_path):
+        try:
+            with np.load(index_path) as index:
+                index["keys"], index["vectors"]
+        except Exception:
+            report["corrupt_files"].append(index_path)
+
+    pdfs = glob.glob(os.path.join(data_dir, "cache", "reports", "*.pdf"))
+    for workdir in workdirs:
+        pdfs += glob.glob(os.path.join(workdir, "*.pdf"))
+    report["corrupt_files"] += [p for p in pdfs if not is_valid_pdf(p)]
+
+    report["stray_temp_files"] = glob.glob(
+        os.path.join(data_dir, "**", "*.tmp*"), recursive=True
+    )
+    return report
+
+
+def run_load_test(
+    clients: int = 8,
+    requests: int = 10,
+    mix: dict[str, int] | None = None,
+    problems: int = 4,
+    llm_latency: float = 0.3,
+    seed: int = 0,
+    keep: bool = False,
+) -> dict:
+    mix = mix or {"hint": 5, "analyze": 3, "report": 2}
+    root = tempfile.mkdtemp(prefix="cpcoach-load-")
+    cli, data_dir = make_sandbox(root)
+
+    cf = start_standin(CONTEST_ID, problems, release_after=0)
+    gemini = start_gemini_standin(latency=llm_latency, jitter=llm_latency / 2)
+    env = dict(
+        os.environ,
+        CF_BASE_URL=cf.url,
+        GEMINI_BASE_URL=gemini.url,
+        GEMINI_API_KEY="loadtest",
+    )
+    problem_keys = [f"{CONTEST_ID}{p['index']}" for p in cf.problems]
+
+    results = []
+    lock = threading.Lock()
+    workdirs = [os.path.join(root, f"client{i}") for i in range(clients)]
+    threads = []
+    for i, workdir in enumerate(workdirs):
+        rng = random.Random(seed * 1000 + i)
+        ops = rng.choices(list(mix), weights=list(mix.values()), k=requests)
+        threads.append(
+            threading.Thread(
+                target=run_client,
+                args=(
+                    cli,
+                    env,
+                    workdir,
+                    ops,
+                    problem_keys,
+                    rng,
+                    results,
+                    lock,
+                ),
+            )
+        )
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - start
+
+    outcome = {
+        "clients": clients,
+        "requests": len(results),
+        "wall_seconds": wall_seconds,
+        "throughput_per_s": len(results) / wall_seconds,
+        "gemini_calls": gemini.calls,
+        "operations": summarize(results, wall_seconds),
+        "integrity": check_integrity(data_dir, workdirs, results),
+        "sandbox": root if keep else None,
+    }
+
+    cf.shutdown()
+    gemini.shutdown()
+    if not keep:
+        shutil.rmtree(root, ignore_errors=True)
+    return outcome
+
+
+def print_outcome(outcome: dict) -> None:
+    print(
+        f"{outcome['requests']} requests from {outcome['clients']} clients in "
+        f"{outcome['wall_seconds']:.1f}s ({outcome['throughput_per_s']:.2f} req/s, "
+        f"{outcome['gemini_calls']} Gemini calls)\n"
+    )
+    print(
+        f"{'op':<8} {'reqs':>5} {'unanalyzed':>10} {'err%':>6} {'req/s':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for op, s in outcome["operations"].items():
+        print(
+            f"{op:<8} {s['requests']:>5} {s['not_analyzed']:>10} "
+            f"{100 * s['error_rate']:>5.1f}% "
+            f"{s['throughput_per_s']:>7.2f} {s['p50_ms']:>8.0f} "
+            f"{s['p95_ms']:>8.0f} {s['p99_ms']:>8.0f}"
+        )
+        for error, count in s["error_kinds"].items():
+            print(f"    {count}x {error}")
+
+    integrity = outcome["integrity"]
+    print("\nIntegrity:")
+    print(f"  cf_cache.json corrupt: {integrity['cf_cache_corrupt']}")
+    for key in ("lost_cache_writes", "corrupt_files", "stray_temp_files"):
+        items = integrity[key]
+        print(f"  {key.replace('_', ' ')}: {len(items)}")
+        for item in items:
+            print(f"    {item}")
+    if outcome["sandbox"]:
+        print(f"\nSandbox kept at {outcome['sandbox']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="cpcoach load generator")
+    parser.add_argument("--clients", "-c", type=int, default=8)
+    parser.add_argument("--requests", "-n", type=int, default=10, help="Per client")
+    parser.add_argument("--mix", default="hint=5,analyze=3,report=2")
+    parser.add_argument("--problems", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="Keep the sandbox")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    outcome = run_load_test(
+        clients=args.clients,
+        requests=args.requests,
+        mix=parse_mix(args.mix),
+        problems=args.problems,
+        llm_latency=args.llm_latency,
+        seed=args.seed,
+        keep=args.keep,
+    )
+    print_outcome(outcome)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(outcome, f, indent=2)
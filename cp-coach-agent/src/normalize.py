@@ -0,0 +1,196 @@
+import math
+import re
+
+# Header lines of a Codeforces statement, each followed by its value
+HEADER_FIELDS = (
+    "time limit per test",
+    "memory limit per test",
+    "input",
+    "output",
+)
+SECTION_TITLES = {
+    "Input",
+    "Output",
+    "Interaction",
+    "Example",
+    "Examples",
+    "Note",
+    "Notes",
+    "Scoring",
+}
+SAMPLE_TITLES = ("Input", "Output")
+# Prefix the scraper puts in front of every <li>
+LIST_ITEM = "•"
+
+MAX_SAMPLE_LINES = 12
+MAX_LINE_CHARS = 200
+
+LATEX_REPLACEMENTS = [
+    (r"\$\$\$", "$"),
+    (r"\\(?:le|leq)(?![a-zA-Z])", "<="),
+    (r"\\(?:ge|geq)(?![a-zA-Z])", ">="),
+    (r"\\(?:ne|neq)(?![a-zA-Z])", "!="),
+    (r"\\lt(?![a-zA-Z])", "<"),
+    (r"\\gt(?![a-zA-Z])", ">"),
+    (r"\\(?:cdot|times)(?![a-zA-Z])", "*"),
+    (r"\\(?:ldots|cdots|dots)(?![a-zA-Z])", "..."),
+    (r"\\(?:bmod|mod)(?![a-zA-Z])", "mod"),
+    (r"\\(?:left|right)(?![a-zA-Z])", ""),
+    (r"\\(?:texttt|textbf|textit|text|mathrm|mathbf|mathit)\{([^{}]*)\}", r"\1"),
+    (r"([_^])\{(\w+)\}", r"\1\2"),
+    (r"\\[,;:! ]", " "),
+    (r"[ \t]+", " "),
+]
+LATEX_REPLACEMENTS = [(re.compile(p), r) for p, r in LATEX_REPLACEMENTS]
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English/ASCII text; good enough for comparisons
+    return math.ceil(len(text) / 4)
+
+
+def compact_latex(text: str) -> str:
+    for pattern, replacement in LATEX_REPLACEMENTS:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def squash(text: str) -> str:
+    return " ".join(text.split())
+
+
+def strip_header(lines: list[str], title: str) -> list[str]:
+    """Drop the title / time limit / memory limit / io file header."""
+    i = 0
+    if i < len(lines) and lines[i] == title:
+        i += 1
+    while i < len(lines) and lines[i] in HEADER_FIELDS:
+        i += 2
+    return lines[i:]
+
+
+def split_sections(lines: list[str]) -> list[tuple[str, list[str]]]:
+    sections = [("Statement", [])]
+    for line in lines:
+        in_examples = sections[-1][0].startswith("Example")
+        if in_examples and line in SAMPLE_TITLES:
+            sections[-1][1].append(line)
+        elif line in SECTION_TITLES:
+            sections.append((line, []))
+        else:
+            sections[-1][1].append(line)
+    return sections
+
+
+def join_fragments(lines: list[str]) -> list[str]:
+    """
+    get_text("\\n") breaks paragraphs at every inline tag (<b>, <i>, spans).
+    Glue a line back onto the previous one unless that one ended a sentence,
+    introduced a list (":"), ended a list item (";"), or the line is a list
+    item itself (scraped <li> start with LIST_ITEM).
+    """
+    paragraphs = []
+    for line in lines:
+        if (
+            not paragraphs
+            or line.startswith(LIST_ITEM)
+            or paragraphs[-1].endswith((":", ";"))
+            or (paragraphs[-1].endswith((".", "?", "!")) and not line[0].islower())
+        ):
+            paragraphs.append(line)
+        elif line[0] in ",.;:)!?":
+            paragraphs[-1] += line
+        else:
+            paragraphs[-1] += " " + line
+    return paragraphs
+
+
+def dedupe(paragraphs: list[str], seen: set) -> list[str]:
+    """Drop paragraphs already emitted in an earlier section."""
+    kept = []
+    for p in paragraphs:
+        if squash(p) not in seen:
+            seen.add(squash(p))
+            kept.append(p)
+    return kept
+
+
+def truncate_line(line: str) -> str:
+    if len(line) <= MAX_LINE_CHARS:
+        return line
+    return f"{line[:MAX_LINE_CHARS]} ... ({len(line) - MAX_LINE_CHARS} more chars)"
+
+
+def compact_samples(lines: list[str]) -> list[str]:
+    blocks = []
+    for line in lines:
+        if line in SAMPLE_TITLES:
+            blocks.append((line, []))
+        elif blocks:
+            blocks[-1][1].append(line)
+
+    out = []
+    for label, body in blocks:
+        out.append(f"{label}:")
+        out += [truncate_line(line) for line in body[:MAX_SAMPLE_LINES]]
+        if len(body) > MAX_SAMPLE_LINES:
+            out.append(f"... ({len(body) - MAX_SAMPLE_LINES} more lines)")
+    return out
+
+
+def limit_value(text: str, field: str) -> str:
+    return text[len(field) :] if text.startswith(field) else text
+
+
+def statement_parts(problem: dict) -> list[str]:
+    """The statement's sections, compacted, without the title header."""
+    lines = [line.strip() for line in problem["statement"].splitlines()]
+    lines = strip_header([line for line in lines if line], problem["title"])
+
+    seen = set()
+    parts = []
+    titles = set()
+    for title, body in split_sections(lines):
+        if title.startswith("Example"):
+            body = compact_samples(body)
+        else:
+            body = dedupe([compact_latex(p) for p in join_fragments(body)], seen)
+        if body:
+            titles.add(title)
+            parts.append(f"{title}:\n" + "\n".join(body))
+
+    # The scraped input/output fields repeat the statement's own sections
+    for title, field in (("Input", "input"), ("Output", "output")):
+        text = problem.get(field, "")
+        if text.startswith(title + "\n"):
+            text = text[len(title) + 1 :]
+        if title not in titles and text:
+            parts.append(f"{title}:\n{compact_latex(text)}")
+    return parts
+
+
+def limits_text(problem: dict) -> str:
+    time_limit = limit_value(problem.get("time_limit", ""), HEADER_FIELDS[0])
+    memory_limit = limit_value(problem.get("memory_limit", ""), HEADER_FIELDS[1])
+    return f"Limits: {time_limit or 'N/A'}, {memory_limit or 'N/A'}"
+
+
+def normalize_problem(problem_key: str, problem: dict) -> str:
+    """
+    Build a compact prompt from a scraped problem: no header, the input /
+    output specs only once, light LaTeX, and size-capped samples.
+    """
+    head = (
+        f"{problem_key}: {problem['title']}\n"
+        f"Rating: {problem.get('rating', 'N/A')} | {limits_text(problem)}"
+    )
+    return "\n\n".join([head] + statement_parts(problem))
+
+
+def duplicate_text(problem: dict) -> str:
+    """
+    normalize_problem() without the key, title and rating: equal for the
+    same problem in Div. 1 and Div. 2, different as soon as any constraint,
+    limit or sample differs.
+    """
+    return "\n\n".join([limits_text(problem)] + statement_parts(problem))
@@ -1,5 +1,8 @@
 from fpdf import FPDF
 import webbrowser
+import hashlib
+import shutil
+import threading
 import json
 import sys
 import os
@@ -246,7 +249,7 @@ def PDF(content, theme="dark", global_line_height=1.6):
     pdf.body(content["takeaway"])
 
     pdf.h3("Reference Implementation")
-    pdf.code("cpcoach solve <problem_id> --lang <lang>")
+    pdf.code("cpcoach solution <problem_id> --file <file> --lang cpp,py,java")
 
     return pdf
 
@@ -328,9 +331,32 @@ def content_from_json(cache_data, scraped_data):
 # pdf.output_pdf(f"cpcoach_analysis_{content['problem_name']}.pdf")
 
 from cf_lookup import lookup_or_scrape
+from singleflight import single_flight
 
+# Bump whenever PDF() or content_from_json() change what ends up in the report
+RENDERER_VERSION = 1
+REPORT_CACHE_DIR = resource_path("../data/cache/reports")
 
-def generate_pdf_report(problem_name: str, theme="dark", auto_open=True):
+
+def artifact_key(*parts) -> str:
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def write_atomic(path: str, write) -> None:
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def generate_pdf_report(
+    problem_name: str, theme="dark", auto_open=True, global_line_height=1.6
+):
+    """
+    Render (or reuse) the report of a problem and copy it to the working dir.
+    Content is cached by (analysis, scraped data); the PDF additionally by
+    the theme definition and line height, so a theme change only re-renders.
+    """
     problem_name = problem_name.strip().upper()
     scraped_data = lookup_or_scrape(problem_name)
 
@@ -339,12 +365,41 @@ def generate_pdf_report(problem_name: str, theme="dark", auto_open=True):
     with open(cache_file_path, encoding="utf-8") as file:
         cache_data = json.load(file)
 
-    content = content_from_json(cache_data, scraped_data)
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+
+    content_key = artifact_key(
+        "content", RENDERER_VERSION, cache_data["analysis"], scraped_data
+    )
+    content_path = os.path.join(REPORT_CACHE_DIR, f"{content_key}.json")
+    if os.path.exists(content_path):
+        with open(content_path, encoding="utf-8") as file:
+            content = json.load(file)
+    else:
+        content = content_from_json(cache_data, scraped_data)
+
+        def dump_content(path):
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(content, file, ensure_ascii=False)
+
+        write_atomic(content_path, dump_content)
 
-    pdf = PDF(content, theme=theme, global_line_height=1.6)
+    pdf_key = artifact_key(
+        "pdf", RENDERER_VERSION, content_key, THEMES[theme], global_line_height
+    )
+    pdf_path = os.path.join(REPORT_CACHE_DIR, f"{pdf_key}.pdf")
+    if not os.path.exists(pdf_path):
+        # Keyed by problem and theme, not pdf_key: one lock file per hash
+        # would pile up in data/locks, as lock files are never deleted
+        with single_flight("render", f"{problem_name}-{theme}"):
+            # Rendered by a concurrent report while we waited?
+            if not os.path.exists(pdf_path):
+                pdf = PDF(content, theme=theme, global_line_height=global_line_height)
+                write_atomic(pdf_path, pdf.output)
 
     filename = f"CPCoach_analysis_{content['problem_name']}.pdf"
     output_path = os.path.join(os.getcwd(), filename)
 
-    pdf.output_pdf(output_path, auto_open=auto_open)
-    # return output_path
+    shutil.copyfile(pdf_path, output_path)
+    if auto_open:
+        webbrowser.open(output_path)
+    return output_path
@@ -0,0 +1,226 @@
+import numpy as np
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from cf_lookup import scraper, split_key, CF_BASE_URL
+from singleflight import file_lock
+
+
+def resource_path(relative_path: str) -> str:
+    """Get absolute path to resource, works in dev and PyInstaller exe"""
+    base_path = getattr(sys, "_MEIPASS", os.path.dirname(__file__))
+    return os.path.join(base_path, relative_path)
+
+
+data_path = resource_path("../data")
+PROBLEMSET_DIR = os.path.join(data_path, "problemset")
+META_FILE = os.path.join(PROBLEMSET_DIR, "meta.json")
+MAX_AGE_SECONDS = 24 * 60 * 60
+
+# One .npy file per column so every column can be memory-mapped on its own
+COLUMNS = {
+    "contest_id": np.int32,
+    "index": "<U4",
+    "rating": np.int16,  # 0 = unrated
+    "solved": np.int32,
+    "tags": np.uint64,  # bit i set <=> problem has meta["tags"][i]
+}
+SORT_KEYS = ("rating", "solved", "contest_id")
+
+
+def fetch_problemset() -> dict:
+    api_url = f"{CF_BASE_URL}/api/problemset.problems"
+    r = scraper.get(api_url, timeout=30)
+    return r.json()["result"]
+
+
+def build_columns(result: dict) -> tuple[dict, dict]:
+    problems = result["problems"]
+    solved = {
+        (s.get("contestId"), s.get("index")): s.get("solvedCount", 0)
+        for s in result.get("problemStatistics", [])
+    }
+
+    # Codeforces has fewer than 64 tags; anything past that cannot be filtered on
+    tags = sorted({t for p in problems for t in p.get("tags", [])})[:64]
+    tag_bits = {t: np.uint64(1) << np.uint64(i) for i, t in enumerate(tags)}
+
+    n = len(problems)
+    columns = {name: np.zeros(n, dtype=dtype) for name, dtype in COLUMNS.items()}
+    names = []
+    for i, p in enumerate(problems):
+        columns["contest_id"][i] = p.get("contestId", 0)
+        columns["index"][i] = p.get("index", "")
+        columns["rating"][i] = p.get("rating", 0)
+        columns["solved"][i] = solved.get((p.get("contestId"), p.get("index")), 0)
+        mask = np.uint64(0)
+        for t in p.get("tags", []):
+            mask |= tag_bits.get(t, np.uint64(0))
+        columns["tags"][i] = mask
+        names.append(p.get("name", ""))
+
+    meta = {"fetched_at": time.time(), "tags": tags, "names": names}
+    return columns, meta
+
+
+def save_problemset(columns: dict, meta: dict) -> None:
+    """
+    Write the columns into a fresh generation directory, then publish it by
+    replacing meta.json. Readers go through meta.json, so they see either the
+    old or the new columns and names, never a mix. Call under
+    file_lock("problemset").
+    """
+    generation = f"{int(meta['fetched_at'])}-{os.getpid()}-{threading.get_ident()}"
+    generation_dir = os.path.join(PROBLEMSET_DIR, generation)
+    os.makedirs(generation_dir)
+    for name, column in columns.items():
+        np.save(os.path.join(generation_dir, f"{name}.npy"), column)
+
+    previous = read_meta()
+    meta = {**meta, "generation": generation}
+    tmp = f"{META_FILE}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, META_FILE)
+
+    # Keep the previous generation: a reader may have just read the old meta
+    keep = {generation, (previous or {}).get("generation")}
+    for entry in os.listdir(PROBLEMSET_DIR):
+        path = os.path.join(PROBLEMSET_DIR, entry)
+        if os.path.isdir(path) and entry not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class Problemset:
+    """Columnar, memory-mapped view of the whole Codeforces problemset."""
+
+    def __init__(self, columns: dict, meta: dict):
+        self.columns = columns
+        self.tags = meta["tags"]
+        self.names = meta["names"]
+        self.fetched_at = meta["fetched_at"]
+
+    def __len__(self) -> int:
+        return len(self.columns["contest_id"])
+
+    def key(self, row: int) -> str:
+        return f"{self.columns['contest_id'][row]}{self.columns['index'][row]}"
+
+    def row(self, key: str) -> int | None:
+        """Row of a problem key such as "1900D" or "1900D1", if present."""
+        parsed = split_key(key)
+        if parsed is None:
+            return None
+        contest_id, index = parsed
+        rows = np.flatnonzero(
+            (self.columns["contest_id"] == contest_id)
+            & (self.columns["index"] == index)
+        )
+        return int(rows[0]) if rows.size else None
+
+    def tag_mask(self, tags: list[str]) -> np.uint64:
+        unknown = [t for t in tags if t not in self.tags]
+        if unknown:
+            raise ValueError(f"Unknown tag(s): {', '.join(unknown)}")
+        mask = np.uint64(0)
+        for t in tags:
+            mask |= np.uint64(1) << np.uint64(self.tags.index(t))
+        return mask
+
+    def row_tags(self, row: int) -> list[str]:
+        mask = int(self.columns["tags"][row])
+        return [t for i, t in enumerate(self.tags) if mask >> i & 1]
+
+    def select(
+        self,
+        min_rating: int | None = None,
+        max_rating: int | None = None,
+        tags: list[str] | None = None,
+        any_tags: list[str] | None = None,
+        contest_from: int | None = None,
+        contest_to: int | None = None,
+        min_solved: int | None = None,
+        max_solved: int | None = None,
+        sort: str = "rating",
+        descending: bool = False,
+        limit: int | None = None,
+    ) -> np.ndarray:
+        """Return the row numbers matching every filter, sorted by `sort`."""
+        rating = self.columns["rating"]
+        contest_id = self.columns["contest_id"]
+        solved = self.columns["solved"]
+        row_tags = self.columns["tags"]
+
+        keep = np.ones(len(self), dtype=bool)
+        if min_rating is not None:
+            keep &= rating >= min_rating
+        if max_rating is not None:
+            keep &= (rating <= max_rating) & (rating > 0)
+        if contest_from is not None:
+            keep &= contest_id >= contest_from
+        if contest_to is not None:
+            keep &= contest_id <= contest_to
+        if min_solved is not None:
+            keep &= solved >= min_solved
+        if max_solved is not None:
+            keep &= solved <= max_solved
+        if tags:
+            mask = self.tag_mask(tags)
+            keep &= (row_tags & mask) == mask
+        if any_tags:
+            keep &= (row_tags & self.tag_mask(any_tags)) != 0
+
+        rows = np.flatnonzero(keep)
+        order = np.argsort(self.columns[sort][rows], kind="stable")
+        if descending:
+            order = order[::-1]
+        rows = rows[order]
+        return rows[:limit] if limit is not None else rows
+
+
+def read_meta() -> dict | None:
+    if not os.path.exists(META_FILE):
+        return None
+    with open(META_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def map_problemset(meta: dict) -> Problemset:
+    # Stores written before generations existed keep their columns at the top
+    generation_dir = os.path.join(PROBLEMSET_DIR, meta.get("generation", ""))
+    columns = {
+        name: np.load(os.path.join(generation_dir, f"{name}.npy"), mmap_mode="r")
+        for name in COLUMNS
+    }
+    return Problemset(columns, meta)
+
+
+def is_stale(meta: dict | None) -> bool:
+    return meta is None or time.time() - meta["fetched_at"] > MAX_AGE_SECONDS
+
+
+def load_problemset(refresh: bool = False) -> Problemset:
+    """
+    Memory-map the stored problemset, downloading it first when it is
+    missing, older than MAX_AGE_SECONDS or `refresh` is set.
+    """
+    meta = read_meta()
+    if refresh or is_stale(meta):
+        seen = meta
+        with file_lock("problemset"):
+            meta = read_meta()
+            # Skip the download if someone refreshed while we waited
+            if is_stale(meta) or (refresh and meta == seen):
+                columns, meta = build_columns(fetch_problemset())
+                save_problemset(columns, meta)
+                meta = read_meta()
+    return map_problemset(meta)
+
+
+def stored_problemset() -> Problemset | None:
+    """The problemset as last downloaded, however old; never downloads."""
+    meta = read_meta()
+    return map_problemset(meta) if meta is not None else None
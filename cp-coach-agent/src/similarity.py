@@ -0,0 +1,202 @@
+import numpy as np
+import os
+import re
+import sys
+import threading
+import zlib
+from normalize import strip_header, split_sections
+from singleflight import file_lock
+
+
+def resource_path(relative_path: str) -> str:
+    """Get absolute path to resource, works in dev and PyInstaller exe"""
+    base_path = getattr(sys, "_MEIPASS", os.path.dirname(__file__))
+    return os.path.join(base_path, relative_path)
+
+
+data_path = resource_path("../data")
+INDEX_FILE = os.path.join(data_path, "similarity_index.npz")
+
+# 10k problems x 512 float32 = 20 MB, and a top-k query is a single mat-vec
+DIMENSIONS = 512
+# Bumped whenever vectorize() / index_text() change; older indexes are rebuilt
+INDEX_VERSION = 2
+# Measured on pairs of Codeforces statements: unrelated problems score
+# 0.0-0.22 (the top ones are string problems sharing "lexicographically",
+# "characters", ...), easy/hard versions of one problem 0.92, and the same
+# problem in Div. 1 and Div. 2 1.0. Related problems with a different story
+# (two tree DP problems) score like unrelated ones: the index finds
+# rewordings and versions, not shared techniques.
+# Only a prefilter for duplicates: numbers are not indexed, so versions that
+# differ only in constraints can score ~1.0 as well (see find_duplicate)
+DUPLICATE_THRESHOLD = 0.995
+RELATED_THRESHOLD = 0.4
+
+TOKEN_RE = re.compile(r"[a-z][a-z0-9]+")
+# Function words plus the phrasing every Codeforces statement shares; left in,
+# they make any two long statements look ~0.5 similar
+STOP_WORDS = frozenset("""
+    about after all also an and any are as at be been before between both but
+    by can case cases contains denote description do does each either equal
+    equals exactly example examples first following for from given guaranteed
+    has have he her his how if in into is it its itself line lines many may
+    more most must next no not note number numbers of on one only or other our
+    output over print respectively second she single some such than that the
+    their them then there these they third this those to two until up value
+    values we what when where whether which who will with you your integer
+    integers test tests input positive non negative exceed sum
+    """.split())
+# "D. Title" / "B1. Title": the index differs between Div. 1 and Div. 2 copies
+INDEX_PREFIX_RE = re.compile(r"^[A-Z]\d*\.\s*")
+
+
+def _features(text: str) -> list[str]:
+    # Word unigrams + bigrams; "$$$" math delimiters, numbers and one-letter
+    # variable names carry no meaning
+    words = [
+        w
+        for w in TOKEN_RE.findall(text.replace("$$$", " ").lower())
+        if w not in STOP_WORDS
+    ]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def vectorize(text: str) -> np.ndarray:
+    """Signed hashed n-gram vector with sublinear tf, L2-normalised."""
+    vec = np.zeros(DIMENSIONS, dtype=np.float32)
+    hashes = np.fromiter(
+        (zlib.crc32(f.encode("utf-8")) for f in _features(text)), dtype=np.uint32
+    )
+    if hashes.size == 0:
+        return vec
+
+    buckets = (hashes % DIMENSIONS).astype(np.intp)
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vec, buckets, signs)
+
+    vec = np.sign(vec) * np.log1p(np.abs(vec))
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class SimilarityIndex:
+    """
+    Dense in-memory matrix of problem vectors, one row per problem key.
+    Rows are stored in a preallocated buffer so incremental adds are O(1).
+    """
+
+    def __init__(self, path: str = INDEX_FILE):
+        self.path = path
+        self.keys: list[str] = []
+        self.positions: dict[str, int] = {}
+        self._vectors = np.zeros((64, DIMENSIONS), dtype=np.float32)
+
+    @classmethod
+    def load(cls, path: str = INDEX_FILE) -> "SimilarityIndex":
+        index = cls(path)
+        if os.path.exists(path):
+            with np.load(path) as data:
+                keys = [str(k) for k in data["keys"]]
+                vectors = data["vectors"]
+                version = int(data["version"]) if "version" in data else 1
+            if version == INDEX_VERSION and vectors.shape[1:] == (DIMENSIONS,):
+                index.keys = keys
+                index.positions = {k: i for i, k in enumerate(keys)}
+                index._vectors = np.array(vectors, dtype=np.float32)
+        return index
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Unique temp name: several threads/processes may save concurrently
+        tmp = f"{self.path}.{os.getpid()}-{threading.get_ident()}.tmp.npz"
+        np.savez(
+            tmp,
+            keys=np.array(self.keys),
+            vectors=self.vectors,
+            version=np.array(INDEX_VERSION),
+        )
+        os.replace(tmp, self.path)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[: len(self.keys)]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.positions
+
+    def add(self, key: str, text: str) -> None:
+        row = self.positions.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == self._vectors.shape[0]:
+                grown = np.zeros((row * 2, DIMENSIONS), dtype=np.float32)
+                grown[:row] = self._vectors[:row]
+                self._vectors = grown
+            self.keys.append(key)
+            self.positions[key] = row
+        self._vectors[row] = vectorize(text)
+
+    def query_vector(
+        self, vec: np.ndarray, k: int = 5, exclude: str | None = None
+    ) -> list[tuple[str, float]]:
+        n = len(self.keys)
+        if n == 0:
+            return []
+
+        scores = self.vectors @ vec
+        if exclude in self.positions:
+            scores[self.positions[exclude]] = -np.inf
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.keys[i], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def query(self, text: str, k: int = 5) -> list[tuple[str, float]]:
+        return self.query_vector(vectorize(text), k)
+
+    def query_key(self, key: str, k: int = 5) -> list[tuple[str, float]]:
+        """Top-k neighbours of an indexed problem, excluding the problem itself."""
+        if key not in self.positions:
+            return []
+        return self.query_vector(self._vectors[self.positions[key]], k, exclude=key)
+
+
+def index_text(problem_data: dict) -> str:
+    """
+    Title and legend only. The Input / Output / Examples / Note sections are
+    mostly boilerplate ("the first line contains t test cases...") and
+    would make unrelated problems look alike.
+    """
+    title = problem_data.get("title", "")
+    lines = [line.strip() for line in problem_data.get("statement", "").splitlines()]
+    sections = split_sections(strip_header([line for line in lines if line], title))
+    legend = "\n".join(sections[0][1])
+    return f"{INDEX_PREFIX_RE.sub('', title)}\n{legend}"
+
+
+def update_index(problem_key: str, problem_data: dict) -> None:
+    # Load-add-save under a lock so concurrent scrapes don't drop each other's rows
+    with file_lock("similarity"):
+        index = SimilarityIndex.load()
+        index.add(problem_key, index_text(problem_data))
+        index.save()
+
+
+def sync_index(problems: dict) -> SimilarityIndex:
+    """Load the index and add any scraped problem it has not seen yet."""
+    index = SimilarityIndex.load()
+    if all(key in index for key in problems):
+        return index
+
+    with file_lock("similarity"):
+        index = SimilarityIndex.load()
+        missing = [key for key in problems if key not in index]
+        for key in missing:
+            index.add(key, index_text(problems[key]))
+        if missing:
+            index.save()
+    return index
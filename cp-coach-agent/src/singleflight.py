@@ -0,0 +1,126 @@
+import json
+import os
+import re
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+if os.name == "nt":
+    import msvcrt
+
+    def _try_lock(f) -> bool:
+        f.seek(0)
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(f) -> None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _try_lock(f) -> bool:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock(f) -> None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def resource_path(relative_path: str) -> str:
+    """Get absolute path to resource, works in dev and PyInstaller exe"""
+    base_path = getattr(sys, "_MEIPASS", os.path.dirname(__file__))
+    return os.path.join(base_path, relative_path)
+
+
+data_path = resource_path("../data")
+LOCK_DIR = os.path.join(data_path, "locks")
+POLL_SECONDS = 0.1
+
+
+class LockTimeout(TimeoutError):
+    pass
+
+
+def lock_path(name: str) -> str:
+    return os.path.join(LOCK_DIR, re.sub(r"[^a-z0-9_.-]", "_", name.lower()) + ".lock")
+
+
+@contextmanager
+def file_lock(name: str, timeout: float | None = None):
+    """
+    Exclusive lock shared by every thread and process using this data dir.
+
+    The lock is an OS lock (flock / msvcrt.locking) on a file under
+    data/locks, so it is released by the OS when its holder exits or
+    crashes: a dead process never leaves a stale lock behind. Lock files
+    are never deleted; removing a file someone may be waiting on would
+    let two holders in at once. Keep names bounded (per problem, not per
+    content hash) so data/locks stays small.
+    """
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    deadline = time.time() + timeout if timeout is not None else None
+
+    with open(lock_path(name), "a+", encoding="utf-8") as f:
+        while not _try_lock(f):
+            if deadline is not None and time.time() >= deadline:
+                raise LockTimeout(f"Timed out waiting for {name}")
+            time.sleep(POLL_SECONDS)
+        try:
+            # Holder details for `cpcoach doctor`; the OS lock is what counts
+            f.seek(0)
+            f.truncate()
+            f.write(
+                json.dumps(
+                    {
+                        "pid": os.getpid(),
+                        "thread": threading.get_ident(),
+                        "host": socket.gethostname(),
+                        "since": time.time(),
+                    }
+                )
+            )
+            f.flush()
+            yield
+        finally:
+            _unlock(f)
+
+
+def single_flight(stage: str, key: str, timeout: float | None = None):
+    """
+    Serialise identical work, keyed by stage ("scrape", "analysis", "code",
+    "render") and problem / artifact key. Whoever gets the lock first does
+    the work; later callers wait, then re-check the cache inside the block
+    and reuse the result instead of redoing it.
+    """
+    return file_lock(f"{stage}-{key.strip()}", timeout)
+
+
+def held_locks() -> list[dict]:
+    """Locks currently held by some live process, with their holder info."""
+    held = []
+    if not os.path.isdir(LOCK_DIR):
+        return held
+    for filename in sorted(os.listdir(LOCK_DIR)):
+        if not filename.endswith(".lock"):
+            continue
+        with open(os.path.join(LOCK_DIR, filename), "a+", encoding="utf-8") as f:
+            if _try_lock(f):
+                _unlock(f)
+                continue
+            try:
+                f.seek(0)
+                holder = json.loads(f.read() or "{}")
+            except (OSError, ValueError):
+                holder = {}
+        held.append({"name": filename[: -len(".lock")], **holder})
+    return held
@@ -0,0 +1,258 @@
+import atexit
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from singleflight import file_lock
+
+
+def resource_path(relative_path: str) -> str:
+    """Get absolute path to resource, works in dev and PyInstaller exe"""
+    base_path = getattr(sys, "_MEIPASS", os.path.dirname(__file__))
+    return os.path.join(base_path, relative_path)
+
+
+data_path = resource_path("../data")
+USAGE_FILE = os.path.join(data_path, "usage.json")
+
+COUNTERS = (
+    "gemini_calls",
+    "input_tokens",
+    "output_tokens",
+    "retries",
+    "problem_cache_hits",
+    "problem_cache_misses",
+    "analysis_cache_hits",
+    "analysis_cache_misses",
+    "code_cache_hits",
+    "code_cache_misses",
+)
+BREAKDOWNS = {"by_command": "command", "by_problem": "problem", "by_model": "model"}
+
+# Reserved per call on top of the prompt estimate: output plus thinking
+# tokens, which usually outweigh the prompt with gemini-2.5-flash
+OUTPUT_ALLOWANCE = 8192
+# A reservation of a process that died is dropped after this long
+RESERVATION_SECONDS = 600
+
+# Rows kept in by_problem; the problems with the fewest tokens go first
+MAX_PROBLEM_ROWS = 2000
+
+_command = "library"
+# Counters not written yet: {(command, problem, model): {counter: value}}
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+def set_command(command: str) -> None:
+    """Attribute everything recorded by this process to a CLI command."""
+    global _command
+    _command = command
+
+
+def today() -> str:
+    return datetime.date.today().isoformat()
+
+
+def load_usage() -> dict:
+    if os.path.exists(USAGE_FILE):
+        with open(USAGE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"totals": {}, "daily_tokens": {}, **{b: {} for b in BREAKDOWNS}}
+
+
+def save_usage(usage: dict) -> None:
+    os.makedirs(os.path.dirname(USAGE_FILE), exist_ok=True)
+    tmp = f"{USAGE_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(usage, f, indent=2)
+    os.replace(tmp, USAGE_FILE)
+
+
+def add_pending(problem: str | None, model: str | None, counters: dict) -> None:
+    key = (_command, problem.strip().upper() if problem else None, model)
+    with _pending_lock:
+        row = _pending.setdefault(key, {})
+        for name, value in counters.items():
+            row[name] = row.get(name, 0) + value
+
+
+def prune_problem_rows(usage: dict) -> None:
+    rows = usage["by_problem"]
+    if len(rows) <= MAX_PROBLEM_ROWS:
+        return
+    by_tokens = sorted(
+        rows,
+        key=lambda p: rows[p].get("input_tokens", 0) + rows[p].get("output_tokens", 0),
+    )
+    for problem in by_tokens[: len(rows) - MAX_PROBLEM_ROWS]:
+        del rows[problem]
+
+
+def flush(reservation: str | None = None) -> None:
+    """
+    Write this process's pending counters to usage.json in one locked
+    read-modify-write, releasing `reservation` (see reserve_quota) with them.
+    """
+    global _pending
+    with _pending_lock:
+        pending, _pending = _pending, {}
+    if not pending and reservation is None:
+        return
+
+    # Every cpcoach process adds to the same file
+    with file_lock("usage"):
+        usage = load_usage()
+        for (command, problem, model), counters in pending.items():
+            labels = {"by_command": command, "by_problem": problem, "by_model": model}
+            buckets = [usage["totals"]] + [
+                usage[b].setdefault(label, {}) for b, label in labels.items() if label
+            ]
+            for bucket in buckets:
+                for name, value in counters.items():
+                    bucket[name] = bucket.get(name, 0) + value
+
+            tokens = counters.get("input_tokens", 0) + counters.get("output_tokens", 0)
+            if tokens:
+                daily = usage["daily_tokens"]
+                daily[today()] = daily.get(today(), 0) + tokens
+        if reservation is not None:
+            usage.get("reservations", {}).pop(reservation, None)
+        prune_problem_rows(usage)
+        save_usage(usage)
+
+
+# Cache lookups only update _pending; whatever is left is written on exit
+atexit.register(flush)
+
+
+def record(
+    problem: str | None = None,
+    model: str | None = None,
+    reservation: str | None = None,
+    **counters,
+) -> None:
+    """
+    Add `counters` to the totals and to the command / problem / model rows
+    and write them right away (with anything pending), releasing
+    `reservation`. Used for Gemini calls and retries, which the daily quota
+    of other processes has to see.
+    """
+    add_pending(problem, model, counters)
+    flush(reservation)
+
+
+def record_gemini_call(
+    problem: str | None,
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    retries: int = 0,
+    reservation: str | None = None,
+) -> None:
+    record(
+        problem,
+        model,
+        reservation,
+        gemini_calls=1,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        retries=retries,
+    )
+
+
+def record_cache(kind: str, hit: bool, problem: str | None = None) -> None:
+    """
+    kind is "problem" (cf_cache.json), "analysis" (data/cache/*.txt) or
+    "code" (one solution language inside a data/cache/*.txt entry).
+    Batched: written with the next record() or when the process exits.
+    """
+    add_pending(problem, None, {f"{kind}_cache_{'hits' if hit else 'misses'}": 1})
+
+
+def daily_quota() -> int | None:
+    """Per-day token budget from CPCOACH_DAILY_TOKEN_QUOTA, if set."""
+    quota = os.getenv("CPCOACH_DAILY_TOKEN_QUOTA")
+    return int(quota) if quota else None
+
+
+def tokens_today(usage: dict | None = None) -> int:
+    usage = usage or load_usage()
+    return usage["daily_tokens"].get(today(), 0)
+
+
+def live_reservations(usage: dict) -> dict:
+    now = time.time()
+    return {
+        rid: r
+        for rid, r in usage.get("reservations", {}).items()
+        if r["day"] == today() and r["expires"] > now
+    }
+
+
+def reserve_quota(estimated_tokens: int = 0) -> str | None:
+    """
+    Hold `estimated_tokens` + OUTPUT_ALLOWANCE of today's quota for a call
+    about to be made, or raise QuotaExceeded. Reservations live in
+    usage.json, so concurrent calls in any process count against each other
+    before either has recorded its usage. Returns the reservation id to pass
+    to record(), or None without a quota.
+    """
+    quota = daily_quota()
+    if quota is None:
+        return None
+    needed = estimated_tokens + OUTPUT_ALLOWANCE
+
+    with file_lock("usage"):
+        usage = load_usage()
+        reservations = live_reservations(usage)
+        used = tokens_today(usage)
+        reserved = sum(r["tokens"] for r in reservations.values())
+        if used + reserved + needed > quota:
+            raise QuotaExceeded(
+                f"Daily token quota reached: {used} used + {reserved} reserved + "
+                f"~{needed} needed > {quota} (CPCOACH_DAILY_TOKEN_QUOTA)"
+            )
+        rid = f"{os.getpid()}-{threading.get_ident()}-{time.time()}"
+        reservations[rid] = {
+            "day": today(),
+            "tokens": needed,
+            "expires": time.time() + RESERVATION_SECONDS,
+        }
+        usage["reservations"] = reservations
+        save_usage(usage)
+    return rid
+
+
+def export_json(usage: dict | None = None) -> str:
+    usage = usage or load_usage()
+    return json.dumps(
+        {**usage, "tokens_today": tokens_today(usage), "daily_quota": daily_quota()},
+        indent=2,
+    )
+
+
+def export_prometheus(usage: dict | None = None) -> str:
+    """Prometheus textfile-collector format."""
+    usage = usage or load_usage()
+    lines = []
+    for counter in COUNTERS:
+        for breakdown, label in BREAKDOWNS.items():
+            metric = f"cpcoach_{counter}_{breakdown}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for value, row in sorted(usage[breakdown].items()):
+                escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{metric}{{{label}="{escaped}"}} {row.get(counter, 0)}')
+
+    lines.append("# TYPE cpcoach_tokens_today gauge")
+    lines.append(f"cpcoach_tokens_today {tokens_today(usage)}")
+    if daily_quota() is not None:
+        lines.append("# TYPE cpcoach_daily_token_quota gauge")
+        lines.append(f"cpcoach_daily_token_quota {daily_quota()}")
+    return "\n".join(lines) + "\n"
@@ -1,9 +1,16 @@
 import os
 import sys
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
+from google.genai import errors
 from dotenv import load_dotenv
-from cf_lookup import lookup_or_scrape
+from cf_lookup import lookup_or_scrape, load_cache
+from normalize import normalize_problem, duplicate_text, estimate_tokens
+from similarity import sync_index, DUPLICATE_THRESHOLD, RELATED_THRESHOLD
+from usage import reserve_quota, record, record_cache, record_gemini_call
+from singleflight import single_flight
 
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -27,6 +34,20 @@ with open(code_prompt_path, encoding="utf-8") as f:
     CODE_SYSTEM_PROMPT = f.read()
 
 
+# CLI language key -> (name given to the model, source file extension)
+LANGUAGES = {
+    "cpp": ("C++17", ".cpp"),
+    "py": ("Python 3", ".py"),
+    "java": ("Java 17", ".java"),
+}
+DEFAULT_LANGUAGE = "cpp"
+
+
+def code_cache_key(lang: str) -> str:
+    # "code" predates multi-language support and keeps holding the C++ solution
+    return "code" if lang == DEFAULT_LANGUAGE else f"code_{lang}"
+
+
 def formatInput(problem: str) -> str:
     return f"Problem: {problem.strip()}"
 
@@ -68,18 +89,62 @@ def extract_json_safe(text: str) -> dict:
             raise ValueError(f"Invalid JSON:\n{json_str}")
 
 
-# Reuse a single client
-client = genai.Client(api_key=GEMINI_API_KEY)
+# Reuse a single client; GEMINI_BASE_URL can point it at gemini_standin.py
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+client = genai.Client(
+    api_key=GEMINI_API_KEY,
+    http_options={"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else None,
+)
+
+
+GEMINI_MODEL = "gemini-2.5-flash"
+GEMINI_MAX_RETRIES = 3
+GEMINI_RETRY_BACKOFF = 5
 
 
-def getResponseFromGemini(problem: str, system_prompt: str) -> dict:
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=[
-            {"role": "user", "parts": [{"text": system_prompt + "\n\n" + problem}]}
-        ],
+def is_retryable(error: Exception) -> bool:
+    return isinstance(error, errors.ServerError) or (
+        isinstance(error, errors.APIError) and error.code == 429
     )
-    return extract_json_safe(response.text)
+
+
+def generate(prompt: str, problem_key: str | None = None) -> str:
+    """One Gemini generation with quota check, retries and usage accounting."""
+    reservation = reserve_quota(estimate_tokens(prompt))
+
+    for attempt in range(1, GEMINI_MAX_RETRIES + 1):
+        try:
+            response = client.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=[{"role": "user", "parts": [{"text": prompt}]}],
+            )
+            break
+        except Exception as e:
+            if attempt == GEMINI_MAX_RETRIES or not is_retryable(e):
+                record(problem_key, GEMINI_MODEL, reservation, retries=attempt - 1)
+                raise
+            time.sleep(GEMINI_RETRY_BACKOFF * attempt)
+
+    # Thinking tokens are billed as output
+    meta = response.usage_metadata
+    record_gemini_call(
+        problem_key,
+        GEMINI_MODEL,
+        input_tokens=(meta and meta.prompt_token_count) or 0,
+        output_tokens=(
+            ((meta and meta.candidates_token_count) or 0)
+            + ((meta and meta.thoughts_token_count) or 0)
+        ),
+        retries=attempt - 1,
+        reservation=reservation,
+    )
+    return response.text
+
+
+def getResponseFromGemini(
+    problem: str, system_prompt: str, problem_key: str | None = None
+) -> dict:
+    return extract_json_safe(generate(system_prompt + "\n\n" + problem, problem_key))
 
 
 def strip_code_fences(code: str) -> str:
@@ -92,66 +157,218 @@ def strip_code_fences(code: str) -> str:
     return code.strip()
 
 
-def getCode(problem: str, system_prompt: str, language="C++17") -> str:
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=[
-            {
-                "role": "user",
-                "parts": [
-                    {
-                        "text": f"{system_prompt}\n\nWrite a complete {language} solution "
-                        f"for the following problem. Output ONLY the code. No explanations.\n\n{problem}"
-                    }
-                ],
-            }
-        ],
+def getCode(
+    problem: str,
+    system_prompt: str,
+    language="C++17",
+    problem_key: str | None = None,
+) -> str:
+    prompt = (
+        f"{system_prompt}\n\nWrite a complete {language} solution "
+        "for the following problem. Output ONLY the code. No explanations."
+        f"\n\n{problem}"
     )
-    return strip_code_fences(response.text)
+    return strip_code_fences(generate(prompt, problem_key))
 
 
-def getProblemFromCF(problem_number: str):
+def problem_prompt(problem_number: str) -> tuple[str, dict]:
+    """Compact prompt text for a problem plus its estimated token savings."""
     problem_number = problem_number.strip().upper()
     problem_dict = lookup_or_scrape(problem_number)
-    problem_text = f"{problem_number} \nProblem Title: {problem_dict["title"]} \nProblem Statement: {problem_dict["statement"]} \nProblem Inputs: {problem_dict["input"]} \nProblem Outputs: {problem_dict["output"]}"
-    return problem_text
 
+    # What used to be sent verbatim, kept only to measure the savings
+    raw_text = (
+        f"{problem_number} \nProblem Title: {problem_dict['title']} "
+        f"\nProblem Statement: {problem_dict['statement']} "
+        f"\nProblem Inputs: {problem_dict['input']} "
+        f"\nProblem Outputs: {problem_dict['output']}"
+    )
+    problem_text = normalize_problem(problem_number, problem_dict)
 
-def getProblemAnalysis(problem: str):
-    problem_text = getProblemFromCF(problem)
-    formatted_problem = formatInput(problem_text)
-    analysis_response = getResponseFromGemini(formatted_problem, ANALYSIS_SYSTEM_PROMPT)
-    code_response = getCode(formatted_problem, CODE_SYSTEM_PROMPT)
+    stats = {
+        "raw_tokens": estimate_tokens(raw_text),
+        "prompt_tokens": estimate_tokens(problem_text),
+    }
+    return problem_text, stats
 
-    final_response = {"analysis": analysis_response, "code": code_response}
 
-    # Ensure data/cache directories exist
-    data_path = resource_path("../data")
+def getProblemFromCF(problem_number: str):
+    return problem_prompt(problem_number)[0]
+
+
+def analysis_cache_path(problem: str) -> str:
     cache_path = resource_path("../data/cache")
-    os.makedirs(data_path, exist_ok=True)
-    os.makedirs(cache_path, exist_ok=True)
+    return os.path.join(cache_path, f"{problem.strip().lower()}.txt")
+
+
+def load_analysis_cache(problem: str) -> dict:
+    with open(analysis_cache_path(problem), encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_analysis_cache(problem: str, data: dict) -> None:
+    # Ensure data/cache directories exist
+    cache_file_path = analysis_cache_path(problem)
+    os.makedirs(os.path.dirname(cache_file_path), exist_ok=True)
+
+    tmp = f"{cache_file_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=4)
+    os.replace(tmp, cache_file_path)
+
+
+def find_similar(problem: str, k: int = 5) -> list[tuple[str, float]]:
+    """Top-k scraped problems whose statements are closest to `problem`."""
+    problem_key = problem.strip().upper()
+    index = sync_index(load_cache())
+    return index.query_key(problem_key, k)
+
+
+def related_analyses_text(related: list[tuple[str, float]]) -> str:
+    lines = ["Related prior analyses (similar problems, reuse only if they apply):"]
+    for key, score in related:
+        prior = load_analysis_cache(key)["analysis"]
+        observation = prior.get("analysis", {}).get("key_observation", "N/A")
+        approach = prior.get("solution", {}).get("approach", "N/A")
+        lines.append(
+            f"- {key} (similarity {score:.2f}): "
+            f"key observation: {observation}; approach: {approach}"
+        )
+    return "\n".join(lines)
+
+
+def getProblemAnalysis(problem: str, with_code: bool = True) -> dict | None:
+    """
+    Analyse and cache a problem; returns the prompt token savings, or None
+    when nothing was sent to Gemini (another process finished the analysis
+    first, or a duplicate's analysis was reused).
+    with_code=False caches only the analysis (hints); the C++ solution is
+    then generated on demand by generate_solutions().
+    """
+    problem_text, stats = problem_prompt(problem)
+
+    with single_flight("analysis", problem):
+        # A concurrent caller may have finished this analysis while we waited
+        if os.path.exists(analysis_cache_path(problem)):
+            return None
+        generated = analyse_problem(problem, problem_text, with_code)
+    return stats if generated else None
+
+
+def find_duplicate(problem: str, similar: list[tuple[str, float]]) -> str | None:
+    candidates = [key for key, score in similar if score >= DUPLICATE_THRESHOLD]
+    if not candidates:
+        return None
+    problems = load_cache()
+    own_text = duplicate_text(problems[problem.strip().upper()])
+    for key in candidates:
+        if key in problems and duplicate_text(problems[key]) == own_text:
+            return key
+    return None
+
+
+def analyse_problem(problem: str, problem_text: str, with_code: bool) -> bool:
+    """Analyse and cache `problem`; False if a duplicate's analysis was reused."""
+    formatted_problem = formatInput(problem_text)
+
+    # Only neighbours that were already analysed are useful here
+    similar = [
+        (key, score)
+        for key, score in find_similar(problem, k=3)
+        if os.path.exists(analysis_cache_path(key))
+    ]
+
+    # Exact duplicates (e.g. the same problem in Div. 1 and Div. 2) reuse the
+    # analysis. The index ignores numbers, so easy/hard versions can score ~1.0
+    # too: only the full statement, constraints included, decides.
+    duplicate_key = find_duplicate(problem, similar)
+    if duplicate_key is not None:
+        final_response = dict(load_analysis_cache(duplicate_key))
+        final_response["duplicate_of"] = duplicate_key
+        save_analysis_cache(problem, final_response)
+        return False
+
+    analysis_problem = formatted_problem
+    related = [(key, score) for key, score in similar if score >= RELATED_THRESHOLD]
+    if related:
+        analysis_problem += "\n\n" + related_analyses_text(related)
+
+    # The analysis and the reference code are independent generations
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        analysis_future = pool.submit(
+            getResponseFromGemini, analysis_problem, ANALYSIS_SYSTEM_PROMPT, problem
+        )
+        code_future = (
+            pool.submit(
+                getCode,
+                formatted_problem,
+                CODE_SYSTEM_PROMPT,
+                problem_key=problem,
+            )
+            if with_code
+            else None
+        )
+        final_response = {"analysis": analysis_future.result()}
+        if code_future is not None:
+            final_response["code"] = code_future.result()
 
     # Cache individual problem
-    cache_file_path = os.path.join(cache_path, f"{problem.strip().lower()}.txt")
-    with open(cache_file_path, "w", encoding="utf-8") as file:
-        json.dump(final_response, file, indent=4)
+    save_analysis_cache(problem, final_response)
+    return True
 
 
-def write_solution(write_file_path: str, problem: str):
-    cache_path = resource_path("../data/cache")
-    cache_file_path = os.path.join(cache_path, f"{problem.strip().lower()}.txt")
+def generate_solutions(problem: str, languages: list[str]) -> dict:
+    """
+    Return {lang: code} for the requested languages.
+    Cached languages are served as-is; missing ones are generated concurrently
+    and stored under their own cache key.
+    """
+    languages = list(dict.fromkeys(languages))
+    if not os.path.exists(analysis_cache_path(problem)):
+        # The reference code is only worth generating alongside if it was asked for
+        getProblemAnalysis(problem, with_code=DEFAULT_LANGUAGE in languages)
+
+    cache_data = load_analysis_cache(problem)
+    missing = [lang for lang in languages if code_cache_key(lang) not in cache_data]
+    for lang in languages:
+        record_cache("code", lang not in missing, problem)
+
+    if missing:
+        with single_flight("code", problem):
+            # Reload: whoever held the lock before us may have generated some
+            cache_data = load_analysis_cache(problem)
+            missing = [
+                lang for lang in languages if code_cache_key(lang) not in cache_data
+            ]
+            if missing:
+                formatted_problem = formatInput(getProblemFromCF(problem))
+                with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+                    futures = {
+                        lang: pool.submit(
+                            getCode,
+                            formatted_problem,
+                            CODE_SYSTEM_PROMPT,
+                            LANGUAGES[lang][0],
+                            problem,
+                        )
+                        for lang in missing
+                    }
+                    for lang, future in futures.items():
+                        cache_data[code_cache_key(lang)] = future.result()
+                save_analysis_cache(problem, cache_data)
+
+    return {lang: cache_data[code_cache_key(lang)] for lang in languages}
+
 
-    with open(cache_file_path, encoding="utf-8") as file:
-        code_solution = json.load(file)["code"]
+def write_solution(write_file_path: str, problem: str, lang: str = DEFAULT_LANGUAGE):
+    code_solution = generate_solutions(problem, [lang])[lang]
     with open(write_file_path, "w", encoding="utf-8") as wf:
         wf.write(code_solution)
 
 
 def getHint(level: int, problem: str) -> str:
-    cache_path = resource_path("../data/cache")
-    cache_file_path = os.path.join(cache_path, f"{problem.strip().lower()}.txt")
-
-    with open(cache_file_path, encoding="utf-8") as file:
-        hints = json.load(file)["analysis"]["hints"]
+    hit = os.path.exists(analysis_cache_path(problem))
+    record_cache("analysis", hit, problem)
+    hints = load_analysis_cache(problem)["analysis"]["hints"]
 
     return hints.get(f"level{level}", f"Error: No Hint Level Beyond {level}")
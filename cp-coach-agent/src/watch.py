@@ -0,0 +1,131 @@
+import os
+import queue
+import threading
+import time
+from cf_lookup import (
+    scraper,
+    CF_BASE_URL,
+    UNRATED,
+    lookup_or_scrape,
+    set_rating_refresh,
+)
+from utils import getProblemAnalysis, generate_solutions, analysis_cache_path
+from usage import QuotaExceeded
+
+POLL_SECONDS = 15
+
+# Task priorities, lowest first: every problem's hints before anyone's code,
+# and within a stage problems in contest order (A before B)
+HINTS = 0
+CODE = 1
+STOP = 2
+
+
+def contest_problems(contest_id: int) -> list[dict] | None:
+    """Problems of a contest, or None while they are not visible yet."""
+    url = f"{CF_BASE_URL}/api/contest.standings?contestId={contest_id}&from=1&count=1"
+    try:
+        data = scraper.get(url, timeout=20).json()
+    except Exception:
+        return None
+    if data.get("status") != "OK":
+        return None
+    return data["result"]["problems"] or None
+
+
+def wait_for_release(
+    contest_id: int, poll_seconds: float, log, timeout: float | None = None
+) -> list[dict] | None:
+    deadline = time.time() + timeout if timeout is not None else None
+    while True:
+        problems = contest_problems(contest_id)
+        if problems:
+            return problems
+        if deadline is not None and time.time() >= deadline:
+            return None
+        log("WAIT", f"Contest {contest_id} is not visible yet, polling again")
+        time.sleep(poll_seconds)
+
+
+def watch_contest(
+    contest_id: int,
+    languages: list[str] | None = None,
+    workers: int = 2,
+    poll_seconds: float = POLL_SECONDS,
+    timeout: float | None = None,
+    log=lambda tag, message: None,
+) -> dict:
+    """
+    Wait until the contest's problems are visible, scrape them in order and
+    analyse them on `workers` threads while scraping continues. Queued hint
+    tasks always run before queued code tasks (solutions in `languages`,
+    none if empty). Returns {problem: status}.
+    """
+    languages = ["cpp"] if languages is None else languages
+    problems = wait_for_release(contest_id, poll_seconds, log, timeout)
+    if problems is None:
+        log("TIMEOUT", f"Contest {contest_id} problems never became visible")
+        return {}
+
+    keys = [f"{contest_id}{p['index']}" for p in problems]
+    log("RELEASED", f"{len(keys)} problems: {', '.join(keys)}")
+
+    status = {key: "pending" for key in keys}
+    tasks = queue.PriorityQueue()
+
+    def scrape_all():
+        # One at a time: lookup_or_scrape rewrites cf_cache.json and is rate limited
+        for position, (key, problem) in enumerate(zip(keys, problems)):
+            # Running contests are unrated; later lookups fill the rating in
+            rating = problem.get("rating", UNRATED)
+            if lookup_or_scrape(key, rating=rating) is None:
+                status[key] = "scrape failed"
+                log("ERROR", f"Could not scrape {key}")
+                continue
+            status[key] = "scraped"
+            log("SCRAPED", key)
+            tasks.put((HINTS, position, key))
+
+    def work():
+        while True:
+            stage, position, key = tasks.get()
+            try:
+                if stage == STOP:
+                    return
+                if stage == HINTS:
+                    if not os.path.exists(analysis_cache_path(key)):
+                        getProblemAnalysis(key, with_code=False)
+                    status[key] = "hints"
+                    log("HINTS", f"{key} hints cached")
+                    if languages:
+                        tasks.put((CODE, position, key))
+                else:
+                    generate_solutions(key, languages)
+                    status[key] = "complete"
+                    log("CODE", f"{key} {', '.join(languages)} solution(s) cached")
+            except QuotaExceeded as e:
+                status[key] = "quota exceeded"
+                log("ERROR", f"{key}: {e}")
+            except Exception as e:
+                status[key] = "failed"
+                log("ERROR", f"{key}: {e}")
+            finally:
+                tasks.task_done()
+
+    # The contest is running: leave the UNRATED entries alone until it is over
+    set_rating_refresh(False)
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        scrape_all()
+        tasks.join()
+    finally:
+        for _ in threads:
+            tasks.put((STOP, 0, ""))
+        for thread in threads:
+            thread.join()
+        set_rating_refresh(True)
+
+    return status